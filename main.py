@@ -4,16 +4,28 @@
 
 import os
 import re
+import sys
+import json
+import heapq
+import sqlite3
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8
+    from backports.zoneinfo import ZoneInfo
 from collections import defaultdict, Counter
 
-import pytz
 from aiogram import Bot, Dispatcher
 from aiogram.types import Message
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.client.session.aiohttp import AiohttpSession
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 # =========================
@@ -29,155 +41,275 @@ TZ_NAME = os.getenv("LOCAL_TZ", "America/Chihuahua")
 RESUME_HORA = int(os.getenv("RESUME_HORA", "8"))
 RESUME_MIN = int(os.getenv("RESUME_MIN", "30"))
 
+# Base SQLite donde se guardan las entradas (sobrevive reinicios)
+DB_PATH = os.getenv("DB_PATH", "entradas.db")
+
 # =========================
 # Inicialización
 # =========================
 logging.basicConfig(level=logging.INFO)
-bot = Bot(token=TOKEN)
+# Una sola sesión aiohttp para todo el bot: las conexiones a api.telegram.org
+# se reutilizan (keep-alive) y el pool queda acotado.
+session = AiohttpSession(limit=30)
+bot = Bot(token=TOKEN, session=session)
 dp = Dispatcher()
 scheduler = AsyncIOScheduler()
 
-tz = pytz.timezone(TZ_NAME)
-
-# Memoria simple en proceso (día actual)
-ENTRADAS: List[Dict] = []
+tz = ZoneInfo(TZ_NAME)
+
+# Autocommit + WAL: cada entrada se escribe sola y las lecturas no bloquean.
+db = sqlite3.connect(DB_PATH, isolation_level=None)
+db.executescript("""
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+CREATE TABLE IF NOT EXISTS entradas(
+    ts INTEGER NOT NULL,
+    semaforo TEXT NOT NULL,
+    medio TEXT NOT NULL,
+    actores TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entradas_ts ON entradas(ts);
+""")
+
+# Una columna recibida (atributos en vez de llaves de dict). Sin slots=True:
+# es de Python 3.10 y el bot sigue soportando 3.8 (ver import de ZoneInfo).
+@dataclass
+class Entrada:
+    semaforo: str             # 🟢/🟡/🔴/⚠️
+    actores: List[str]
+    medio: str
+    url: str
+    ts: datetime              # aware (hora de llegada)
+
+# Memoria simple en proceso (día actual): sólo agregados, no la lista de entradas.
+@dataclass
+class EstadoDia:
+    fecha: date
+    total: int = 0
+    semaforo: Counter = field(default_factory=Counter)
+    por_actor: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+    medios: Set[str] = field(default_factory=set)
+    urls: Set[str] = field(default_factory=set)
+
+    def registrar(self, item: Entrada) -> bool:
+        # Un mismo link reenviado varias veces sólo cuenta una vez al día
+        if item.url in self.urls:
+            return False
+        self.urls.add(item.url)
+        sem = item.semaforo
+        self.total += 1
+        self.semaforo[sem] += 1
+        for act in item.actores or ["OTROS DE INTERES"]:
+            self.por_actor[act][sem] += 1
+            self.por_actor[act]["TOTAL"] += 1
+        self.medios.add(item.medio)
+        return True
+
+ESTADO = EstadoDia(fecha=datetime.now(tz).date())
 
 # =========================
 # Utilidades
 # =========================
 
-RE_URL = re.compile(r"(https?://\S+)", re.IGNORECASE)
-RE_HEADER = re.compile(r"^\s*([🟢🟡🔴⚠️])?\s*(.+?)\s*$")
+RE_URL = re.compile(r"https?://\S+", re.IGNORECASE)
+RE_SEP_ACTORES = re.compile(r"\s*[,&]\s*")
 
-def hoy_range() -> Tuple[datetime, datetime]:
-    now = datetime.now(tz)
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=1)
-    return start, end
+# Primer carácter de cada emoji -> semáforo. "⚠️" son dos caracteres
+# (⚠ + selector de variación U+FE0F), por eso se indexa por "⚠".
+SEMAFORO_POR_CHAR = {"🟢": "🟢", "🟡": "🟡", "🔴": "🔴", "⚠": "⚠️"}
+ORDEN_SEMAFORO = ("🟢", "🟡", "🔴", "⚠️")
+RE_SEMAFORO = re.compile("[🟢🟡🔴⚠]")
+# Semáforos que además se avisan al canal de alertas
+SEMAFOROS_ALERTA = frozenset(("🔴", "⚠️"))
 
 def normaliza(s: str) -> str:
-    # Mayúsculas, sin espacios extra
-    return re.sub(r"\s+", " ", s.strip()).upper()
+    # Mayúsculas, sin espacios extra (split/join colapsa y recorta en C)
+    return " ".join(s.split()).upper()
+
+def primera_linea(texto: str) -> str:
+    # Primera línea no vacía (recortada), avanzando con find en vez de partir
+    # todo el texto: los mensajes pueden traer la columna completa abajo.
+    inicio, n = 0, len(texto)
+    while inicio < n:
+        fin = texto.find("\n", inicio)
+        if fin < 0:
+            fin = n
+        linea = texto[inicio:fin].strip()
+        if linea:
+            return linea
+        inicio = fin + 1
+    return ""
 
 def pick_semaforo_from_body(texto: str) -> str:
     # Cuenta emojis en el cuerpo si no hay en encabezado
-    counts = Counter(ch for ch in texto if ch in "🟢🟡🔴⚠️")
+    # El regex recorre el texto en C; Python sólo ve los emojis encontrados
+    counts = Counter(SEMAFORO_POR_CHAR[ch] for ch in RE_SEMAFORO.findall(texto))
     if not counts:
         return "🟡"
     # si empatan, prioriza 🟡
-    orden = ["🟢", "🟡", "🔴", "⚠️"]
-    return max(orden, key=lambda e: (counts.get(e, 0)))
+    # Counter devuelve 0 para lo que no aparece: sin lambda ni .get por emoji
+    return max(ORDEN_SEMAFORO, key=counts.__getitem__)
 
-def parse_encabezado_y_medio(texto: str) -> Tuple[str, List[str], str]:
+class Encabezado(NamedTuple):
+    emoji: str                # "" si la línea no empieza con emoji
+    actores: Tuple[str, ...]
+    medio: str
+
+@lru_cache(maxsize=512)
+def parse_encabezado(linea: str) -> Encabezado:
     """
-    Detecta encabezado en la PRIMERA línea no vacía.
-    Soporta con o sin emoji al inicio.
+    Parsea la línea de encabezado (ya recortada). Es pura y los encabezados
+    se repiten entre columnas del mismo medio, así que se memoiza.
     actor = primer segmento
     medio = último segmento
     """
-    lineas = [l for l in texto.splitlines() if l.strip()]
-    if not lineas:
-        return "🟡", [], ""
+    resto = linea
+    # Emoji al inicio: un solo lookup por el primer carácter
+    emoji_hdr = SEMAFORO_POR_CHAR.get(resto[:1], "")
+    if emoji_hdr:
+        resto = resto[1:].lstrip("\ufe0f").strip()
 
-    header_line = lineas[0]
-    m = RE_HEADER.match(header_line)
-    if not m:
-        # sin header claro -> semáforo desde cuerpo, sin actores
-        sem = pick_semaforo_from_body(texto)
-        return sem, [], ""
+    # Sólo se usan el primer y el último segmento: no se normalizan los de en medio
+    segmentos = [t for t in resto.split("/") if t.strip()]
+    if not segmentos:
+        return Encabezado(emoji_hdr, (), "")
 
-    emoji_hdr, resto = m.groups()
-    tokens = [normaliza(t) for t in resto.split("/") if t.strip()]
     # Actor(es) = primer segmento (puede traer varios separados por coma o &)
     actores: List[str] = []
-    if tokens:
-        primer = tokens[0]
-        # divide por coma o “ & ”
-        for a in re.split(r"\s*,\s*|\s*&\s*", primer):
-            if a:
-                actores.append(a)
+    # divide por coma o “ & ”
+    for a in RE_SEP_ACTORES.split(normaliza(segmentos[0])):
+        if a:
+            # intern: el mismo actor se repite todo el día como llave de Counter
+            actores.append(sys.intern(a))
 
-    medio = tokens[-1] if len(tokens) >= 1 else ""
+    medio = normaliza(segmentos[-1])
+    return Encabezado(emoji_hdr, tuple(actores), medio)
 
+def parse_encabezado_y_medio(texto: str) -> Tuple[str, List[str], str]:
+    """
+    Detecta encabezado en la PRIMERA línea no vacía.
+    Soporta con o sin emoji al inicio.
+    """
+    linea = primera_linea(texto)
+    if not linea:
+        return "🟡", [], ""
+
+    enc = parse_encabezado(linea)
     # Si no vino emoji al inicio, decide por el cuerpo:
-    sem = emoji_hdr if emoji_hdr in ("🟢", "🟡", "🔴", "⚠️") else pick_semaforo_from_body(texto)
-    return sem, actores, medio
+    sem = enc.emoji or pick_semaforo_from_body(texto)
+    return sem, list(enc.actores), enc.medio
+
+# Mapeos comunes dominio -> medio (se revisan en orden; "heraldodechihuahua"
+# también cubre "elheraldodechihuahua")
+MEDIOS_POR_DOMINIO: Tuple[Tuple[str, str], ...] = (
+    ("vozenred", "VOZ EN RED"),
+    ("entrelineas", "ENTRELÍNEAS"),
+    ("omnia", "OMNIA"),
+    ("netnoticias", "NET NOTICIAS"),
+    ("heraldodechihuahua", "EL HERALDO DE CHIHUAHUA"),
+)
 
 def medio_desde_url(url: str) -> str:
     try:
-        host = re.sub(r"^https?://", "", url, flags=re.IGNORECASE).split("/")[0]
-        host = host.lower()
-    except Exception:
+        # hostname ya viene en minúsculas y sin puerto/credenciales
+        host = urlsplit(url).hostname or ""
+    except ValueError:
         return ""
-    # mapeos comunes
-    if "vozenred" in host:
-        return "VOZ EN RED"
-    if "entrelineas" in host:
-        return "ENTRELÍNEAS"
-    if "omnia" in host:
-        return "OMNIA"
-    if "netnoticias" in host:
-        return "NET NOTICIAS"
-    if "elheraldodechihuahua" in host or "heraldodechihuahua" in host:
-        return "EL HERALDO DE CHIHUAHUA"
+    if host.startswith("www."):  # sin removeprefix: es de 3.9
+        host = host[4:]
+    for fragmento, medio in MEDIOS_POR_DOMINIO:
+        if fragmento in host:
+            return medio
     return host.upper()
 
-def parse_mensaje(msg: str) -> Dict:
+def parse_mensaje(msg: str, ts: datetime) -> Entrada:
     """
-    Devuelve dict con:
-    - semaforo: 🟢/🟡/🔴/⚠️
-    - actores: [..]
-    - medio: str
-    - url: str
-    - ts: datetime aware
+    Devuelve la Entrada del mensaje (ts = hora de llegada, la pasa quien llama).
     """
     sem, actores, medio_hdr = parse_encabezado_y_medio(msg)
     url = ""
     m = RE_URL.search(msg)
     if m:
-        url = m.group(1).strip()
-
-    medio = medio_hdr if medio_hdr else (medio_desde_url(url) if url else "SIN MEDIO")
-
-    return {
-        "semaforo": sem,
-        "actores": actores,
-        "medio": medio,
-        "url": url,
-        "ts": datetime.now(tz),
-    }
-
-def dentro_de_hoy(ts: datetime) -> bool:
-    start, end = hoy_range()
-    return start <= ts < end
+        url = m.group(0)
+
+    medio = sys.intern(medio_hdr if medio_hdr else (medio_desde_url(url) if url else "SIN MEDIO"))
+
+    return Entrada(semaforo=sem, actores=actores, medio=medio, url=url, ts=ts)
+
+def registrar_entrada(item: Entrada) -> bool:
+    # Si cambió el día, arranca agregados nuevos (lo de ayer ya no se reporta)
+    global ESTADO
+    fecha = item.ts.date()
+    if fecha != ESTADO.fecha:
+        ESTADO = EstadoDia(fecha=fecha)
+    if not ESTADO.registrar(item):
+        return False
+    db.execute(
+        "INSERT INTO entradas(ts, semaforo, medio, actores, url) VALUES (?, ?, ?, ?, ?)",
+        (int(item.ts.timestamp()), item.semaforo, item.medio,
+         json.dumps(item.actores, ensure_ascii=False), item.url),
+    )
+    return True
+
+def estado_hoy(now: datetime) -> EstadoDia:
+    hoy = now.date()
+    return ESTADO if ESTADO.fecha == hoy else EstadoDia(fecha=hoy)
+
+def link_ya_registrado(url: str, now: datetime) -> bool:
+    return url in ESTADO.urls and ESTADO.fecha == now.date()
+
+async def reinicia_dia() -> None:
+    # Medianoche: suelta los agregados (y el set de links) del día anterior
+    # aunque no llegue ninguna entrada nueva. async para correr en el loop,
+    # junto a los handlers; y sólo si registrar_entrada no cambió ya de día
+    # (si no, se perderían las entradas llegadas desde las 00:00).
+    global ESTADO
+    hoy = datetime.now(tz).date()
+    if ESTADO.fecha != hoy:
+        ESTADO = EstadoDia(fecha=hoy)
+
+def restaura_estado() -> None:
+    # Al arrancar, reconstruye los agregados de hoy desde la base (rango por índice ts)
+    global ESTADO
+    now = datetime.now(tz)
+    inicio = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    estado = EstadoDia(fecha=now.date())
+    rows = db.execute(
+        "SELECT ts, semaforo, medio, actores, url FROM entradas WHERE ts >= ? ORDER BY ts",
+        (int(inicio.timestamp()),),
+    )
+    for ts, sem, medio, actores, url in rows:
+        # mismas llaves interned que en parse_mensaje
+        estado.registrar(Entrada(
+            semaforo=sem,
+            actores=[sys.intern(a) for a in json.loads(actores)],
+            medio=sys.intern(medio),
+            url=url,
+            ts=datetime.fromtimestamp(ts, tz),
+        ))
+    ESTADO = estado
+    logging.info("Entradas de hoy recuperadas: %d", estado.total)
 
 # =========================
 # Render de resumen
 # =========================
 
-def render_resumen(items: List[Dict]) -> str:
-    # Semáforo global
-    c = Counter(it["semaforo"] for it in items)
-    total = len(items)
+def render_resumen(estado: EstadoDia, now: datetime) -> str:
+    # Los conteos ya vienen agregados al registrar cada entrada
+    c = estado.semaforo
+    total = estado.total
     verdes = c.get("🟢", 0)
     amar = c.get("🟡", 0)
     rojos = c.get("🔴", 0)
     alrt = c.get("⚠️", 0)
 
-    # Actores top: agrupa por actor individual
-    by_actor: Dict[str, Counter] = defaultdict(Counter)
-    for it in items:
-        for act in it["actores"] or ["OTROS DE INTERES"]:
-            by_actor[act][it["semaforo"]] += 1
-            by_actor[act]["TOTAL"] += 1
-
-    # Ordena por total desc
-    actores_sorted = sorted(by_actor.items(), key=lambda kv: (-kv[1]["TOTAL"], kv[0]))
+    # Top 10 por total desc (desempate alfabético) sin ordenar a todos los actores
+    actores_top = heapq.nsmallest(10, estado.por_actor.items(), key=lambda kv: (-kv[1]["TOTAL"], kv[0]))
 
     # Medios con publicación (únicos, orden alfabético)
-    medios = sorted({it["medio"] for it in items})
+    medios = sorted(estado.medios)
 
-    now = datetime.now(tz)
     header = f"🔵 COLUMNAS / {now:%a %d %b %Y – %H:%M}".replace("Thu", "Thu").replace("Mon", "Mon")
 
     lines = [header, "", "🪫 Semáforo",
@@ -190,33 +322,107 @@ def render_resumen(items: List[Dict]) -> str:
     # Actores top
     lines.append("👥 Actores top")
     lines.append("-------------------------")
-    if actores_sorted:
-        for actor, cnt in actores_sorted[:10]:
+    if actores_top:
+        for actor, cnt in actores_top:
             g = cnt.get("🟢", 0); y = cnt.get("🟡", 0); r = cnt.get("🔴", 0); w = cnt.get("⚠️", 0); t = cnt.get("TOTAL", 0)
-            lines.append(f"{actor}")
-            lines.append(f"| Total {t}   🟢{g} 🟡{y} 🔴{r} ⚠️{w}")
+            lines.extend((actor, f"| Total {t}   🟢{g} 🟡{y} 🔴{r} ⚠️{w}"))
     else:
         lines.append("—")
 
     lines.append("")
     lines.append("📰 Medios con publicación")
     if medios:
-        for m in medios:
-            lines.append(f"- {m}")
+        lines.extend(f"- {m}" for m in medios)
     else:
         lines.append("—")
 
     return "\n".join(lines)
 
+# Telegram rechaza mensajes de más de 4096 caracteres
+TG_MAX_CHARS = 3800
+
+def partir_mensaje(texto: str, limite: int = TG_MAX_CHARS) -> List[str]:
+    # Parte en bloques <= limite por líneas; de preferencia corta en la última
+    # línea en blanco (fin de sección) si el bloque ya lleva al menos la mitad.
+    partes: List[str] = []
+    lineas: List[str] = []
+    largo = 0
+    for linea in texto.split("\n"):
+        while lineas and largo + len(linea) > limite:
+            corte, acum = len(lineas), 0
+            for i, l in enumerate(lineas):
+                if not l and acum >= limite // 2:
+                    corte = i
+                acum += len(l) + 1
+            parte = "\n".join(lineas[:corte])
+            if parte.strip():  # Telegram rechaza mensajes vacíos
+                partes.append(parte)
+            lineas = lineas[corte + 1:]
+            largo = sum(len(l) + 1 for l in lineas)
+        lineas.append(linea)
+        largo += len(linea) + 1
+    parte = "\n".join(lineas)
+    if parte.strip():
+        partes.append(parte)
+    return partes
+
+async def envia_resumen(chat_id: int, texto: str):
+    # En orden: con gather las partes podrían llegar desordenadas
+    for parte in partir_mensaje(texto):
+        await bot.send_message(chat_id, parte, disable_web_page_preview=True)
+
+# =========================
+# Alertas (cola + worker)
+# =========================
+
+# Los handlers sólo encolan; un único worker envía, junta hasta
+# ALERTAS_POR_ENVIO avisos (sin pasar de ALERTAS_MAX_CHARS) en un mensaje
+# y se pausa entre envíos. Todo va a un solo chat (ALERTS_CHAT_ID), así que
+# manda el límite por chat de Telegram (~1 msg/s, ~20 msg/min en grupos),
+# no el global de ~30 msg/s por bot.
+ALERTAS_POR_ENVIO = 5
+ALERTAS_MAX_CHARS = TG_MAX_CHARS
+ALERTAS_PAUSA_S = 60 / 20
+# Se crea en main(): en Python < 3.10 una Queue creada al importar queda
+# atada a otro loop y falla bajo asyncio.run.
+ALERTAS_Q: "Optional[asyncio.Queue[str]]" = None
+
+async def worker_alertas():
+    pendiente = None  # aviso que ya no cupo en el lote anterior
+    while True:
+        aviso = pendiente if pendiente is not None else await ALERTAS_Q.get()
+        pendiente = None
+        lote, largo = [aviso], len(aviso)
+        while len(lote) < ALERTAS_POR_ENVIO and not ALERTAS_Q.empty():
+            sig = ALERTAS_Q.get_nowait()
+            if largo + 2 + len(sig) > ALERTAS_MAX_CHARS:
+                pendiente = sig
+                break
+            lote.append(sig)
+            largo += 2 + len(sig)
+        texto = "\n\n".join(lote)
+        while True:
+            try:
+                await bot.send_message(ALERTS_CHAT_ID, texto, disable_web_page_preview=True)
+            except TelegramRetryAfter as e:
+                # 429: espera lo que pide Telegram y reenvía el MISMO lote
+                logging.warning("Alertas limitadas por Telegram, reintento en %ss", e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception:
+                logging.exception("No se pudo enviar alerta")
+            break
+        await asyncio.sleep(ALERTAS_PAUSA_S)
+
 # =========================
 # Handlers
 # =========================
 
 @dp.message(Command("resumen_hoy"))
 async def cmd_resumen_hoy(message: Message):
-    subset = [it for it in ENTRADAS if dentro_de_hoy(it["ts"])]
-    texto = render_resumen(subset)
-    await bot.send_message(SUMMARY_CHAT_ID or message.chat.id, texto, disable_web_page_preview=True)
+    now = datetime.now(tz)
+    texto = render_resumen(estado_hoy(now), now)
+    await envia_resumen(SUMMARY_CHAT_ID or message.chat.id, texto)
 
 @dp.message()
 async def on_any_message(message: Message):
@@ -228,47 +434,60 @@ async def on_any_message(message: Message):
     if not txt:
         return
 
-    if RE_URL.search(txt) is None:
-        # si no trae link, la ignoramos (regla original)
+    # si no trae link, la ignoramos (regla original). "://" descarta casi
+    # toda la plática del grupo sin pasar por el regex.
+    m = RE_URL.search(txt) if "://" in txt else None
+    if m is None:
+        return
+
+    # reenvío/reintento de un link ya contado hoy: ni siquiera se parsea
+    now = datetime.now(tz)
+    if link_ya_registrado(m.group(0), now):
         return
 
-    item = parse_mensaje(txt)
-    ENTRADAS.append(item)
+    item = parse_mensaje(txt, now)
+    if not registrar_entrada(item):
+        # link repetido hoy: ni se cuenta ni se vuelve a alertar
+        return
 
     # ALERTA: si viene ⚠️ o 🔴, reenvía al canal de alertas
-    if item["semaforo"] in ("⚠️", "🔴") and ALERTS_CHAT_ID:
-        medio = item["medio"]
-        acts = ", ".join(item["actores"]) if item["actores"] else "OTROS DE INTERES"
-        aviso = f"🚨 {item['semaforo']} {acts} – {medio}\n{item['url']}"
-        await bot.send_message(ALERTS_CHAT_ID, aviso, disable_web_page_preview=True)
+    if item.semaforo in SEMAFOROS_ALERTA and ALERTS_CHAT_ID and ALERTAS_Q is not None:
+        acts = ", ".join(item.actores) if item.actores else "OTROS DE INTERES"
+        aviso = f"🚨 {item.semaforo} {acts} – {item.medio}\n{item.url}"
+        ALERTAS_Q.put_nowait(aviso)
 
 # =========================
 # Tarea programada 8:30 AM
 # =========================
 
 async def enviar_resumen_autom():
-    subset = [it for it in ENTRADAS if dentro_de_hoy(it["ts"])]
-    titulo = render_resumen(subset)
-    await bot.send_message(SUMMARY_CHAT_ID or SOURCE_CHAT_ID or 0, titulo, disable_web_page_preview=True)
+    now = datetime.now(tz)
+    titulo = render_resumen(estado_hoy(now), now)
+    await envia_resumen(SUMMARY_CHAT_ID or SOURCE_CHAT_ID or 0, titulo)
 
 def programa_job():
-    # 8:30 hora local
-    now = datetime.now(tz)
-    run_at = now.replace(hour=RESUME_HORA, minute=RESUME_MIN, second=0, microsecond=0)
-    if run_at < now:
-        run_at += timedelta(days=1)
-    scheduler.add_job(enviar_resumen_autom, "date", run_date=run_at)
-    # vuelve a programar cada día
-    scheduler.add_job(enviar_resumen_autom, "cron", hour=RESUME_HORA, minute=RESUME_MIN, timezone=tz)
+    # 8:30 hora local, todos los días. El cron ya cubre la primera corrida;
+    # un job "date" adicional duplicaba el resumen del primer día.
+    scheduler.add_job(enviar_resumen_autom, "cron", hour=RESUME_HORA, minute=RESUME_MIN,
+                      timezone=tz, id="resumen_autom", replace_existing=True)
+    scheduler.add_job(reinicia_dia, "cron", hour=0, minute=0,
+                      timezone=tz, id="reinicio_dia", replace_existing=True)
 
 # =========================
 # Main
 # =========================
 
 async def main():
+    global ALERTAS_Q
+    ALERTAS_Q = asyncio.Queue()
+    restaura_estado()
     programa_job()
     scheduler.start()
-    await dp.start_polling(bot)
+    worker = asyncio.create_task(worker_alertas())
+    try:
+        await dp.start_polling(bot)
+    finally:
+        worker.cancel()
 
 if __name__ == "__main__":
     asyncio.run(main())